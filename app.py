@@ -1,13 +1,75 @@
+import math
+import re
+import time
 import streamlit as st
-import pandas as pd
-import altair as alt # <-- NEW IMPORT
 
-# --- MODIFIED IMPORT ---
-# We now also import 'get_market_breadth'
-from backend import process_tickers, get_qqq_status, get_market_breadth
+# The backend (yfinance, scipy, ...) is imported lazily inside the functions
+# that need it, so the landing page renders without paying for those imports.
 
 st.set_page_config(layout="wide")
 
+
+# Seconds a finished scan is reused for an identical set of inputs
+SCAN_CACHE_TTL = 300
+
+
+@st.cache_resource
+def _scan_cache():
+    """
+    Process-wide {scan params: (finished_at, results)} store. This is a plain dict
+    rather than st.cache_data because a scan drives the progress bar through its
+    callback, and st.cache_data would record those element writes for replay on
+    every cache hit, where the progress elements no longer exist.
+    """
+    return {}
+
+
+def _run_scan(scan_params, status_callback):
+    """
+    Returns the results for scan_params (sorted ticker tuple and filter inputs),
+    running the screener, with progress reporting, only when no recent scan with
+    the same parameters exists.
+    """
+    cache = _scan_cache()
+    entry = cache.get(scan_params)
+    if entry is not None and time.monotonic() - entry[0] <= SCAN_CACHE_TTL:
+        return entry[1]
+
+    from backend import process_tickers
+    tickers_key, min_dte, max_dte, portfolio_value = scan_params
+    results = process_tickers(list(tickers_key), min_dte, max_dte, portfolio_value,
+                              status_callback=status_callback)
+
+    now = time.monotonic()
+    # Drop expired scans so the store only holds recent parameter sets
+    for key, (finished_at, _) in list(cache.items()):
+        if now - finished_at > SCAN_CACHE_TTL:
+            cache.pop(key, None)
+    cache[scan_params] = (now, results)
+    return results
+
+# A Yahoo symbol token: an optional ^ (indices), then up to 10 letters, digits, dots,
+# dashes or = signs (e.g. BRK.B, BF-B, ^SPX, 7203.T, ES=F)
+_TICKER_RE = re.compile(r'\^?[A-Za-z0-9][A-Za-z0-9.\-=]{0,9}')
+# Tickers in the input are separated by commas and/or whitespace
+_TICKER_SEP_RE = re.compile(r'[\s,]+')
+
+# Minimum seconds between progress bar updates during a scan
+PROGRESS_MIN_INTERVAL = 0.1
+
+# Client-side display formats for the results table; the columns stay float64
+RESULTS_COLUMN_CONFIG = {
+    'Premium': st.column_config.NumberColumn(format='$%.2f'),
+    'Strike': st.column_config.NumberColumn(format='%.2f'),
+    'Score': st.column_config.NumberColumn(format='%.1f'),
+    'IV Rank': st.column_config.NumberColumn(format='%.1f%%'),
+    'Delta': st.column_config.NumberColumn(format='%.3f'),
+    'Ann. Return': st.column_config.NumberColumn(format='%.1f%%'),
+    'Margin of Safety': st.column_config.NumberColumn(format='%.1f%%'),
+}
+# Fractions shown as percentages (scaled by 100 before display)
+PERCENT_COLUMNS = ['IV Rank', 'Ann. Return', 'Margin of Safety']
+
 # --- UI Styling ---
 st.markdown("""
     <style>
@@ -80,174 +142,191 @@ min_dte, max_dte = st.sidebar.slider(
 )
 
 
+# Vega-Lite spec for the market breadth chart: bars with value labels plus dashed
+# oversold/overbought reference lines. Written out directly (rather than built with
+# Altair) so each render skips Altair's chart construction and schema validation;
+# only the data values and title are filled in per run.
+BREADTH_CHART_SPEC = {
+    'height': 250,
+    # Three bars and two rules: the SVG renderer draws this small scene cheaper than canvas
+    'usermeta': {'embedOptions': {'renderer': 'svg'}},
+    'layer': [
+        {
+            # The x-axis labels name the bars and the text marks print the values,
+            # so there is no legend or tooltip
+            'encoding': {
+                'x': {'field': 'Metric', 'type': 'nominal', 'sort': None,
+                      'axis': {'title': None, 'labelAngle': 0}},
+                'y': {'field': 'Percentage', 'type': 'quantitative',
+                      'title': 'Percentage of Stocks', 'scale': {'domain': [0, 100]}},
+                'color': {'field': 'Metric', 'type': 'nominal', 'sort': None, 'legend': None},
+            },
+            'layer': [
+                {'mark': {'type': 'bar'}},
+                # Text labels on bars, positioned slightly above each bar
+                {'mark': {'type': 'text', 'align': 'center', 'baseline': 'middle', 'dy': -8, 'color': 'white'},
+                 'encoding': {'text': {'field': 'Percentage', 'type': 'quantitative', 'format': '.1f'}}},
+            ],
+        },
+        {
+            'data': {'values': [{'y': 15, 'label': 'Oversold (15%)'},
+                                {'y': 85, 'label': 'Overbought (85%)'}]},
+            'encoding': {'y': {'field': 'y', 'type': 'quantitative'}},
+            'layer': [
+                # Horizontal reference lines and their labels
+                {'mark': {'type': 'rule', 'strokeDash': [5, 5], 'color': 'gray'}},
+                {'mark': {'type': 'text', 'align': 'right', 'dx': 190, 'dy': 5, 'color': 'gray'},
+                 'encoding': {'text': {'field': 'label', 'type': 'nominal'}}},
+            ],
+        },
+    ],
+}
+
+
+# --- Dashboard Sections ---
+def render_market_internals():
+    """Market breadth chart and QQQ weekly-EMA deployment triggers."""
+    from backend import get_market_breadth, get_qqq_status
+
+    st.subheader("Market Internals & QQQ Strategy")
+
+    # --- 1. Market Breadth Chart ---
+    with st.container(border=True):
+        st.markdown("#### Market Breadth (NASDAQ-100)")
+        with st.spinner("Calculating market breadth... (This may take a moment on first run)"):
+            breadth_data = get_market_breadth()
+            if breadth_data:
+                # Splice this run's values into the prebuilt spec (shallow copy;
+                # the shared constant is never mutated)
+                values = [
+                    {'Metric': metric, 'Percentage': None if math.isnan(pct) else float(pct)}
+                    for metric, pct in (('% > MA20', breadth_data['breadth_20']),
+                                        ('% > MA50', breadth_data['breadth_50']),
+                                        ('% > MA200', breadth_data['breadth_200']))
+                ]
+                spec = {
+                    **BREADTH_CHART_SPEC,
+                    'data': {'values': values},
+                    'title': f"Based on {breadth_data['count']} NASDAQ-100 Components",
+                }
+                st.vega_lite_chart(spec, use_container_width=True)
+
+            else:
+                st.warning("Could not calculate market breadth.")
+
+    # --- 2. QQQ Deployment Strategy ---
+    with st.container(border=True):
+        st.markdown("#### QQQ Deployment Strategy")
+        try:
+            with st.spinner("Analyzing QQQ Weekly EMA status..."):
+                qqq_status = get_qqq_status() 
+
+            if qqq_status:
+                price = qqq_status['current_price']
+                ema_26 = qqq_status['ema_26']
+                ema_52 = qqq_status['ema_52']
+                ema_104 = qqq_status['ema_104']
+
+                st.metric("QQQ Current Price", f"${price:,.2f}")
+
+                col1, col2, col3 = st.columns(3)
+
+                # --- EMA 26 ---
+                col1.metric("26-Week EMA (130d)", f"${ema_26:,.2f}")
+                if price <= ema_26:
+                    col1.error("🚨 TRIGGER 1: Deploy 20%")
+                else:
+                    col1.success(f"Price is ${price - ema_26:,.2f} above.")
+
+                # --- EMA 52 ---
+                col2.metric("52-Week EMA (260d)", f"${ema_52:,.2f}")
+                if price <= ema_52:
+                    col2.error("🚨 TRIGGER 2: Deploy 50% Rem.")
+                else:
+                    col2.success(f"Price is ${price - ema_52:,.2f} above.")
+
+                # --- EMA 104 ---
+                col3.metric("104-Week EMA (520d)", f"${ema_104:,.2f}")
+                if price <= ema_104:
+                    col3.error("🚨 TRIGGER 3: Deploy 80% Rem.")
+                else:
+                    col3.success(f"Price is ${price - ema_104:,.2f} above.")
+
+            else:
+                st.warning("Could not retrieve QQQ status.")
+        except Exception as e:
+            st.error(f"Error fetching QQQ status. Make sure 'get_qqq_status' function is in backend.py. Error: {e}")
+
+    st.markdown("---") # Add a separator
+
+
+def render_results(display_data):
+    """Results table for the screener output."""
+    # Numbers are formatted by the frontend via column_config, so no strings are built here
+    display_data = display_data.assign(**{col: display_data[col] * 100 for col in PERCENT_COLUMNS})
+    st.dataframe(display_data, use_container_width=True, column_config=RESULTS_COLUMN_CONFIG)
+
+
 # --- Main Application Logic ---
-if st.sidebar.button("Find Opportunities", type="primary"):
-    # Clean up ticker list
-    tickers_list = [ticker.strip().upper() for ticker in tickers_input.split(',') if ticker.strip()]
-    
-    if not tickers_list:
-        st.warning("Please enter at least one ticker.")
-    else:
-        
-        # --- *** NEW & REVISED QQQ / MARKET INTERNALS SECTION *** ---
-        # If QQQ is in the list, show the dashboards
-        if 'QQQ' in tickers_list:
-            st.subheader("Market Internals & QQQ Strategy")
-
-            # --- 1. Market Breadth Chart ---
-            with st.container(border=True):
-                st.markdown("#### Market Breadth (NASDAQ-100)")
-                with st.spinner("Calculating market breadth... (This may take a moment on first run)"):
-                    breadth_data = get_market_breadth()
-                    if breadth_data:
-                        # Create DataFrame for Altair
-                        data = {
-                            'Metric': ['% > MA20', '% > MA50', '% > MA200'],
-                            'Percentage': [
-                                breadth_data['breadth_20'],
-                                breadth_data['breadth_50'],
-                                breadth_data['breadth_200']
-                            ]
-                        }
-                        df_breadth = pd.DataFrame(data)
-
-                        # Base chart with bars
-                        bars = alt.Chart(df_breadth).mark_bar().encode(
-                            x=alt.X('Metric:N', axis=None), # No x-axis labels
-                            y=alt.Y('Percentage:Q', title='Percentage of Stocks', scale=alt.Scale(domain=[0, 100])),
-                            color=alt.Color('Metric:N', legend=alt.Legend(title="Breadth Metric")),
-                            tooltip=['Metric', alt.Tooltip('Percentage', format='.1f')]
-                        )
-
-                        # Text labels on bars
-                        text = bars.mark_text(
-                            align='center',
-                            baseline='middle',
-                            dy=-8, # Position text slightly above the bar
-                            color='white'
-                        ).encode(
-                            text=alt.Text('Percentage', format='.1f')
-                        )
-
-                        # DataFrame for reference lines
-                        df_lines = pd.DataFrame({
-                            'y': [15, 85],
-                            'label': ['Oversold (15%)', 'Overbought (85%)']
-                        })
-
-                        # Horizontal reference lines
-                        h_lines = alt.Chart(df_lines).mark_rule(strokeDash=[5,5], color='gray').encode(
-                            y='y:Q'
-                        )
-                        
-                        # Text for reference lines
-                        h_text = alt.Chart(df_lines).mark_text(
-                            align='right',
-                            dx=190, # Adjust horizontal position
-                            dy=5,   # Adjust vertical position
-                            color='gray'
-                        ).encode(
-                            y=alt.Y('y:Q'),
-                            text='label:N'
-                        )
-
-                        # Combine all chart elements
-                        chart = (bars + text + h_lines + h_text).properties(
-                            title=f"Based on {breadth_data['count']} NASDAQ-100 Components",
-                            height=250
-                        )
-                        st.altair_chart(chart, use_container_width=True)
-                        
-                    else:
-                        st.warning("Could not calculate market breadth.")
-
-            # --- 2. QQQ Deployment Strategy ---
-            with st.container(border=True):
-                st.markdown("#### QQQ Deployment Strategy")
-                try:
-                    with st.spinner("Analyzing QQQ Weekly EMA status..."):
-                        qqq_status = get_qqq_status() 
-                    
-                    if qqq_status:
-                        price = qqq_status['current_price']
-                        ema_26 = qqq_status['ema_26']
-                        ema_52 = qqq_status['ema_52']
-                        ema_104 = qqq_status['ema_104']
-
-                        st.metric("QQQ Current Price", f"${price:,.2f}")
-
-                        col1, col2, col3 = st.columns(3)
-                        
-                        # --- EMA 26 ---
-                        col1.metric("26-Week EMA (130d)", f"${ema_26:,.2f}")
-                        if price <= ema_26:
-                            col1.error("🚨 TRIGGER 1: Deploy 20%")
-                        else:
-                            col1.success(f"Price is ${price - ema_26:,.2f} above.")
-                        
-                        # --- EMA 52 ---
-                        col2.metric("52-Week EMA (260d)", f"${ema_52:,.2f}")
-                        if price <= ema_52:
-                            col2.error("🚨 TRIGGER 2: Deploy 50% Rem.")
-                        else:
-                            col2.success(f"Price is ${price - ema_52:,.2f} above.")
-
-                        # --- EMA 104 ---
-                        col3.metric("104-Week EMA (520d)", f"${ema_104:,.2f}")
-                        if price <= ema_104:
-                            col3.error("🚨 TRIGGER 3: Deploy 80% Rem.")
-                        else:
-                            col3.success(f"Price is ${price - ema_104:,.2f} above.")
-                        
-                    else:
-                        st.warning("Could not retrieve QQQ status.")
-                except Exception as e:
-                    st.error(f"Error fetching QQQ status. Make sure 'get_qqq_status' function is in backend.py. Error: {e}")
-            
-            st.markdown("---") # Add a separator
-        # --- *** END OF NEW & REVISED SECTION *** ---
-
-        # --- Existing Options Screener Logic ---
-        st.subheader("Put Option Opportunities")
+# Split the ticker list into tokens; only tokens that are a ticker in full are kept,
+# so e.g. '^VIX' or '7203.T' are skipped instead of being rewritten into 'VIX' or 'T'
+ticker_tokens = [token for token in _TICKER_SEP_RE.split(tickers_input) if token]
+skipped_tokens = [token for token in ticker_tokens if not _TICKER_RE.fullmatch(token)]
+if skipped_tokens:
+    st.sidebar.warning(f"Skipping unrecognized tickers: {', '.join(skipped_tokens)}")
+# Canonical (deduplicated, sorted) tuple so that reordered or repeated entries map
+# to the same cache key
+tickers_key = tuple(sorted({token.upper() for token in ticker_tokens if _TICKER_RE.fullmatch(token)}))
+scan_params = (tickers_key, min_dte, max_dte, portfolio_value)
+
+run_scan = st.sidebar.button("Find Opportunities", type="primary")
+# Results of the last scan survive reruns triggered by other widgets, as long
+# as the inputs they were computed for are unchanged
+show_last_scan = st.session_state.get('last_scan_params') == scan_params
+
+if run_scan and not tickers_key:
+    st.warning("Please enter at least one ticker.")
+elif run_scan or show_last_scan:
+    # --- *** NEW & REVISED QQQ / MARKET INTERNALS SECTION *** ---
+    # If QQQ is in the list, show the dashboards
+    if 'QQQ' in tickers_key:
+        render_market_internals()
+    # --- *** END OF NEW & REVISED SECTION *** ---
+
+    # --- Existing Options Screener Logic ---
+    st.subheader("Put Option Opportunities")
+
+    if run_scan:
         progress_bar = st.progress(0)
         status_text = st.empty()
 
+        last_update = [0.0]
+
         def update_progress(message, percent_complete):
-            status_text.text(message)
-            progress_bar.progress(percent_complete)
+            # Coalesce updates: every call is a websocket message to the browser
+            now = time.monotonic()
+            if percent_complete >= 1.0 or now - last_update[0] >= PROGRESS_MIN_INTERVAL:
+                status_text.text(message)
+                progress_bar.progress(percent_complete)
+                last_update[0] = now
 
         with st.spinner("Analyzing options chains... This may take a moment."):
-            results = process_tickers(
-                tickers_list,
-                min_dte,
-                max_dte,
-                portfolio_value,
-                status_callback=update_progress
-            )
+            results = _run_scan(scan_params, update_progress)
         
         status_text.text("Analysis complete!")
         progress_bar.empty()
 
-        if results.empty:
-            st.info("No options found matching your criteria. Try expanding the DTE range or adding more tickers.")
-        else:
-            # --- REVISION ---
-            # Group by ticker and select the top 5 results for each.
-            # This assumes the 'results' DataFrame is already sorted by score from the backend.
-            display_data = results.groupby('Ticker').head(5)
-            
-            st.success(f"Found {len(results)} total opportunities. Displaying top {len(display_data)} (max 5 per ticker).")
-            
-            # Format and display the dataframe
-            results_display = display_data.copy()
-            results_display['Premium'] = results_display['Premium'].map('${:,.2f}'.format)
-            results_display['Strike'] = results_display['Strike'].map('{:,.2f}'.format)
-            results_display['Score'] = results_display['Score'].map('{:.1f}'.format)
-            results_display['IV Rank'] = results_display['IV Rank'].map('{:.1%}'.format)
-            results_display['Delta'] = results_display['Delta'].map('{:.3f}'.format)
-            results_display['Ann. Return'] = results_display['Ann. Return'].map('{:.1%}'.format)
-            results_display['Margin of Safety'] = results_display['Margin of Safety'].map('{:.1%}'.format)
-            
-            st.dataframe(results_display, use_container_width=True)
+        st.session_state['last_scan_params'] = scan_params
+        st.session_state['last_scan_results'] = results
+    else:
+        results = st.session_state['last_scan_results']
+
+    if results.empty:
+        st.info("No options found matching your criteria. Try expanding the DTE range or adding more tickers.")
+    else:
+        # The backend already keeps only the top 5 results per ticker, sorted by score.
+        total_found = results.attrs.get('total_found', len(results))
+        st.success(f"Found {total_found} total opportunities. Displaying top {len(results)} (max 5 per ticker).")
+        render_results(results)
 else:
     st.info("Enter your parameters in the sidebar and click 'Find Opportunities' to begin.")
@@ -1,12 +1,119 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from scipy.stats import norm
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.special import ndtr
+from scipy.signal import lfilter
 import datetime
+import functools
+import hashlib
+import inspect
+import json
+import math
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
 # import requests # No longer needed, pd.read_html handles it
 
 # --- Caching ---
+# On-disk cache shared across Streamlit processes/restarts (st.cache_data is per-process)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+def _read_json_cache(name, max_age):
+    """Returns the payload saved under `name` if it is younger than max_age seconds, else None."""
+    try:
+        with open(os.path.join(CACHE_DIR, name)) as f:
+            entry = json.load(f)
+        if time.time() - entry['saved_at'] <= max_age:
+            return entry['payload']
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def _write_json_cache(name, payload):
+    """Atomically saves a JSON-serializable payload under `name` in CACHE_DIR."""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = os.path.join(CACHE_DIR, name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'saved_at': time.time(), 'payload': payload}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error writing cache file {name}: {e}")
+
+def _prune_disk_cache(prefix, max_age):
+    """Deletes CACHE_DIR files starting with `prefix` (entries and stray temp files) older than max_age seconds."""
+    try:
+        entries = list(os.scandir(CACHE_DIR))
+    except OSError:
+        return
+    now = time.time()
+    for entry in entries:
+        try:
+            if entry.name.startswith(prefix) and now - entry.stat().st_mtime > max_age:
+                os.remove(entry.path)
+        except OSError:
+            pass # Removed concurrently by another thread or process
+
+def _disk_cache(ttl, parquet=False):
+    """
+    Persists a function's results in CACHE_DIR for `ttl` seconds so a restarted
+    process replays them from disk instead of re-hitting Yahoo. Like st.cache_data,
+    the key covers every argument not prefixed with an underscore; None (the error
+    result) is never stored, and expired entries are deleted. With parquet=True the
+    result must be a DataFrame and is stored as columnar Parquet instead of a pickle.
+    Apply beneath @st.cache_data.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        suffix = 'parquet' if parquet else 'pkl'
+        last_pruned = [0.0]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            key = repr([(k, v) for k, v in bound.arguments.items() if not k.startswith('_')])
+            path = os.path.join(CACHE_DIR, f"{func.__name__}-{hashlib.sha1(key.encode()).hexdigest()}.{suffix}")
+            try:
+                if parquet:
+                    # The file's mtime is its save time
+                    if time.time() - os.path.getmtime(path) <= ttl:
+                        return pd.read_parquet(path)
+                else:
+                    with open(path, 'rb') as f:
+                        saved_at, result = pickle.load(f)
+                    if time.time() - saved_at <= ttl:
+                        return result
+            except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+                pass
+
+            result = func(*args, **kwargs)
+            if result is not None:
+                try:
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    # Worker threads may write the same entry, so the temp name is per thread
+                    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    if parquet:
+                        result.to_parquet(tmp_path, compression='zstd')
+                    else:
+                        with open(tmp_path, 'wb') as f:
+                            pickle.dump((time.time(), result), f)
+                    os.replace(tmp_path, path)
+                except (OSError, ValueError, TypeError) as e:
+                    print(f"Error writing cache file for {func.__name__}: {e}")
+                # Keys roll forward with tickers and expirations, so expired entries are
+                # swept on write, at most once per ttl (and on the first write after a start)
+                if time.time() - last_pruned[0] > ttl:
+                    last_pruned[0] = time.time()
+                    _prune_disk_cache(f"{func.__name__}-", ttl)
+            return result
+        return wrapper
+    return decorator
+
 @st.cache_data(ttl=86400) # Cache for 1 day
 def get_ndx_tickers():
     """
@@ -49,6 +156,15 @@ def get_ndx_tickers():
     "QCOM", "REGN", "ROKU", "SBUX", "SGEN", "SIRI", "SNOW", "SPLK",
     "TTWO", "TXN", "UAL", "VRTX", "WDAY", "XEL", "XLNX", "ZM"] # Add more if you like
 
+def _last_window_mean(data, window):
+    """
+    Per-column mean of the last `window` rows; equals rolling(window).mean().iloc[-1]
+    (NaN without a full window of prices) without building the whole rolling frame.
+    """
+    if len(data) < window:
+        return pd.Series(np.nan, index=data.columns)
+    return data.iloc[-window:].mean(skipna=False)
+
 @st.cache_data(ttl=86400) # Cache for 1 hour
 def get_market_breadth():
     """
@@ -72,9 +188,9 @@ def get_market_breadth():
         latest_price = data.iloc[-1]
 
         # Calculate MAs for all stocks
-        ma20 = data.rolling(window=20).mean().iloc[-1]
-        ma50 = data.rolling(window=50).mean().iloc[-1]
-        ma200 = data.rolling(window=200).mean().iloc[-1]
+        ma20 = _last_window_mean(data, 20)
+        ma50 = _last_window_mean(data, 50)
+        ma200 = _last_window_mean(data, 200)
 
         # Count how many stocks are above their MAs
         # .count() gives the number of non-NaN values, which is our true total
@@ -93,67 +209,159 @@ def get_market_breadth():
         return None
 
 @st.cache_data(ttl=900)
-def get_stock_data_and_technicals(ticker):
+def get_price_histories(tickers):
+    """
+    Downloads 1 year of daily closes for all tickers with a single yf.download call.
+    yfinance still fetches each symbol's history separately, but runs those requests
+    concurrently on its own threads, ahead of the per-ticker option work.
+    Returns a dict mapping each ticker to its Close Series.
+    """
+    closes = {}
+    try:
+        data = yf.download(list(tickers), period="1y", auto_adjust=True, progress=False)['Close']
+    except Exception as e:
+        print(f"Error downloading price history for {list(tickers)}: {e}")
+        return closes
+    if isinstance(data, pd.Series): # Older yfinance flattens single-ticker downloads
+        data = data.to_frame(tickers[0])
+    for ticker in data.columns:
+        series = data[ticker].dropna()
+        # A symbol that failed inside the download comes back as an all-NaN column;
+        # leave it out so get_stock_data_and_technicals falls back to stock.history
+        if not series.empty:
+            closes[ticker] = series
+    return closes
+
+@functools.lru_cache(maxsize=256)
+def _ticker_for_day(symbol, day):
+    return yf.Ticker(symbol)
+
+def _ticker(symbol):
+    """
+    Shared yf.Ticker for `symbol`, so the technicals, sector and every expiration's
+    chain reuse one instance. Keyed by date as well, since a Ticker memoizes its
+    expiration list and info for its whole lifetime. A Ticker is not thread-safe:
+    process_tickers loads its expiration list in phase 1 (one thread per symbol)
+    before the concurrent chain fetches read it.
+    """
+    return _ticker_for_day(symbol, datetime.date.today())
+
+# The sector almost never changes, so the (large, slow) .info payload is read once a day
+@st.cache_data(ttl=86400, show_spinner=False)
+@_disk_cache(ttl=86400)
+def get_sector(ticker):
+    """Returns the ticker's sector from yfinance's .info ('N/A' if not reported)."""
+    return _ticker(ticker).info.get('sector', 'N/A')
+
+@st.cache_data(ttl=900, show_spinner=False) # Called from worker threads, where no spinner can render
+@_disk_cache(ttl=900)
+def get_stock_data_and_technicals(ticker, _close=None):
     """
     Fetches serializable stock data, calculates technicals, and historical volatility range.
+    `_close` is an optional pre-fetched 1y Close series (see get_price_histories);
+    it is underscore-prefixed so it does not take part in the cache key.
+    Returns None if there is not enough price history or the fetch fails.
     """
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        # Fetch 1 year of data for HV calculation
-        hist = stock.history(period="1y")
+        stock = _ticker(ticker)
+        # Fetch 1 year of data for HV calculation unless get_price_histories provided it
+        close = _close if _close is not None else stock.history(period="1y")['Close']
 
-        if hist.empty or len(hist) < 30: # Need at least 30 days for rolling HV
-            return None, None, None, None, None, None, None, None
+        if close.empty or len(close) < 30: # Need at least 30 days for rolling HV
+            return None
 
-        price = hist['Close'].iloc[-1]
-        sector = info.get('sector', 'N/A')
+        price = close.iloc[-1]
+        sector = get_sector(ticker)
         expirations = stock.options
 
+        close_arr = close.to_numpy(dtype=float)
+
         # --- Calculate Historical Volatility (HV) Range for IV Rank Proxy ---
-        log_returns = np.log(hist['Close'] / hist['Close'].shift(1))
-        # 30-day rolling annualized volatility
-        rolling_hv = log_returns.rolling(window=30).std() * np.sqrt(252)
-        hv_low_1y = rolling_hv.min()
-        hv_high_1y = rolling_hv.max()
+        log_returns = np.log(close_arr[1:] / close_arr[:-1])
+        # 30-day rolling annualized volatility: std over strided 30-return windows (a view, no copy)
+        if len(log_returns) >= 30:
+            rolling_hv = sliding_window_view(log_returns, 30).std(axis=1, ddof=1) * np.sqrt(252)
+            hv_low_1y = np.nanmin(rolling_hv)
+            hv_high_1y = np.nanmax(rolling_hv)
+        else:
+            hv_low_1y = hv_high_1y = np.nan
 
         # --- Calculate Technical Indicators ---
-        delta_hist = hist['Close'].diff()
-        gain = (delta_hist.where(delta_hist > 0, 0)).rolling(window=14).mean()
-        loss = (-delta_hist.where(delta_hist < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        current_rsi = rsi.iloc[-1] if pd.notna(rsi.iloc[-1]) else 50
-
-        sma_50 = hist['Close'].rolling(window=50).mean().iloc[-1]
-        sma_200 = hist['Close'].rolling(window=200).mean().iloc[-1]
+        # 14-day RSI with Wilder's smoothing (an EWMA with alpha = 1/14) of gains and losses
+        delta_hist = np.diff(close_arr)
+        gain = _ewm_last(np.where(delta_hist > 0, delta_hist, 0), 1 / 14)
+        loss = _ewm_last(np.where(delta_hist < 0, -delta_hist, 0), 1 / 14)
+        if loss > 0:
+            current_rsi = 100 - (100 / (1 + gain / loss))
+        else:
+            # No losses: only gains gives 100; flat (or missing) prices default to neutral
+            current_rsi = 100 if gain > 0 else 50
+
+        # Only the latest SMA values are used, so each is a single mean over the
+        # tail of the price array instead of a full rolling pass
+        sma_50 = close_arr[-50:].mean() if len(close_arr) >= 50 else np.nan
+        sma_200 = close_arr[-200:].mean() if len(close_arr) >= 200 else np.nan
 
         return price, sector, expirations, current_rsi, sma_50, sma_200, hv_low_1y, hv_high_1y
     except Exception as e:
         print(f"Error fetching data for {ticker}: {e}")
-        return None, None, None, None, None, None, None, None
+        return None
 
 
-@st.cache_data(ttl=900)
+@st.cache_data(ttl=900, show_spinner=False) # Called from worker threads, where no spinner can render
+@_disk_cache(ttl=900, parquet=True)
 def get_options_chain_puts(ticker, expiration):
     """Fetches the put options DataFrame for a specific ticker and expiration date."""
     try:
-        stock = yf.Ticker(ticker)
+        stock = _ticker(ticker)
         options = stock.option_chain(expiration)
         return options.puts
     except Exception:
         return None
 
 # --- *** NEW QQQ STATUS FUNCTION (ADDED) *** ---
-@st.cache_data(ttl=900)
+QQQ_STATUS_TTL = 3600 # Weekly EMAs barely move intraday
+# Daily spans for the weekly EMAs: 26/52/104 weeks * 5 days/week
+QQQ_EMA_SPANS = {'ema_26': 130, 'ema_52': 260, 'ema_104': 520}
+# Rebuild the incremental EMA state from full history weekly, so dividend
+# re-adjustments of past 'Adj Close' values do not accumulate. Measured from the
+# state's 'built_at' (the last full rebuild), not from its last incremental save.
+QQQ_EMA_STATE_MAX_AGE = 7 * 86400
+
+def _advance_ema(ema, closes, span):
+    """
+    Applies the EMA recurrence ema = alpha * close + (1 - alpha) * ema over closes,
+    matching pandas ewm(span=span, adjust=False). A None ema starts at the first close.
+    """
+    if len(closes) == 0:
+        return ema
+    return _ewm_last(closes, 2 / (span + 1), initial=ema)
+
+@st.cache_data(ttl=QQQ_STATUS_TTL)
 def get_qqq_status():
     """
     Fetches QQQ data and calculates weekly EMAs based on the strategy.
     Returns a dictionary with current price and EMA values.
+    A copy is persisted to disk so fresh processes skip the download within the TTL.
+    EMAs are advanced incrementally from a persisted state, so only bars newer
+    than the last completed one are downloaded and processed.
     """
+    cached_status = _read_json_cache('qqq_status.json', QQQ_STATUS_TTL)
+    if cached_status is not None:
+        return cached_status
+
     try:
-        # We need ~2 years of data for the 104-week (520-day) EMA
-        start_date = (datetime.date.today() - datetime.timedelta(days=730)).strftime('%Y-%m-%d')
+        # Every incremental advance re-saves the state, so its age is checked against
+        # built_at rather than the save time
+        state = _read_json_cache('qqq_ema_state.json', float('inf'))
+        if state is not None and time.time() - state.get('built_at', 0) > QQQ_EMA_STATE_MAX_AGE:
+            state = None
+        if state is not None:
+            # Only bars after the last completed one are needed
+            start_date = state['last_date']
+        else:
+            # We need ~2 years of data for the 104-week (520-day) EMA
+            start_date = (datetime.date.today() - datetime.timedelta(days=730)).strftime('%Y-%m-%d')
         
         # Download data, setting auto_adjust=False to get 'Adj Close'
         df = yf.download('QQQ', start=start_date, auto_adjust=False)
@@ -168,25 +376,39 @@ def get_qqq_status():
         df.sort_index(inplace=True)
 
         # Calculate EMAs on 'Adj Close' (price adjusted for splits/dividends)
-        # 26 weeks * 5 days/week = 130 days
-        # 52 weeks * 5 days/week = 260 days
-        # 104 weeks * 5 days/week = 520 days
-        df['EMA26'] = df['Adj Close'].ewm(span=130, adjust=False).mean()
-        df['EMA52'] = df['Adj Close'].ewm(span=260, adjust=False).mean()
-        df['EMA104'] = df['Adj Close'].ewm(span=520, adjust=False).mean()
-        
-        # Get the very last row of data
-        latest_data = df.iloc[-1]
-        
+        adj_close = df['Adj Close']
         # Get current price (most recent 'Adj Close')
-        current_price = latest_data['Adj Close']
+        current_price = adj_close.iloc[-1]
+
+        if state is not None:
+            new_closes = adj_close[adj_close.index > pd.Timestamp(state['last_date'])]
+            emas = {key: state[key] for key in QQQ_EMA_SPANS}
+            built_at = state['built_at']
+        else:
+            new_closes = adj_close
+            emas = {key: None for key in QQQ_EMA_SPANS}
+            built_at = time.time()
+
+        if not new_closes.empty:
+            # The latest bar may still be trading, so only the bars before it are
+            # folded into the persisted state; the latest one is applied on top.
+            completed = new_closes.iloc[:-1]
+            if not completed.empty:
+                emas = {key: _advance_ema(emas[key], completed.to_numpy(), span)
+                        for key, span in QQQ_EMA_SPANS.items()}
+                _write_json_cache('qqq_ema_state.json', {
+                    'last_date': completed.index[-1].strftime('%Y-%m-%d'),
+                    'built_at': built_at,
+                    **{key: float(value) for key, value in emas.items()}
+                })
+            emas = {key: _advance_ema(emas[key], new_closes.to_numpy()[-1:], span)
+                    for key, span in QQQ_EMA_SPANS.items()}
         
         status = {
-            'current_price': current_price,
-            'ema_26': latest_data['EMA26'],
-            'ema_52': latest_data['EMA52'],
-            'ema_104': latest_data['EMA104']
+            'current_price': float(current_price),
+            **{key: float(value) for key, value in emas.items()}
         }
+        _write_json_cache('qqq_status.json', status)
         return status
         
     except Exception as e:
@@ -196,48 +418,85 @@ def get_qqq_status():
 
 
 # --- Calculation Logic ---
+def _ewm_last(values, alpha, initial=None):
+    """
+    Final value of the recursive EWMA y = alpha * x + (1 - alpha) * y_prev over values,
+    i.e. pandas ewm(alpha=alpha, adjust=False), run as a scipy.signal.lfilter IIR filter.
+    `initial` is the EWMA before values[0]; without it the EWMA starts at values[0].
+    """
+    values = np.asarray(values, dtype=float)
+    if initial is None:
+        initial, values = values[0], values[1:]
+    if len(values) == 0:
+        return initial
+    filtered, _ = lfilter([alpha], [1, -(1 - alpha)], values, zi=[(1 - alpha) * initial])
+    return filtered[-1]
+
 def black_scholes_put_delta(S, K, T, r, sigma):
-    """Calculates the Black-Scholes delta for a European put option."""
-    if T <= 0 or sigma <= 0:
-        return 0.0 if S > K else -1.0
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-    delta = norm.cdf(d1) - 1
-    return delta
+    """
+    Calculates the Black-Scholes delta for European puts. S, T and r are scalars for
+    one expiration; K and sigma may be arrays.
+    """
+    K = np.asarray(K, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    valid = (T > 0) & (sigma > 0)
+    # Placeholder inputs on the invalid lanes keep the array math warning-free
+    T_safe = T if T > 0 else 1.0
+    sigma_safe = np.where(valid, sigma, 1.0)
+    # Spot and time are shared by the whole chain: take their log and root once
+    log_S = np.log(S)
+    sqrt_T = np.sqrt(T_safe)
+    # (ln(S/K) + (r + sigma^2/2) T) / (sigma sqrt T), with sigma sqrt T formed once per strike
+    sig_sqrt_T = sigma_safe * sqrt_T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (log_S - np.log(K) + r * T_safe) / sig_sqrt_T + 0.5 * sig_sqrt_T
+    # ndtr is the C routine behind norm.cdf, without the distribution-object overhead
+    return np.where(valid, ndtr(d1) - 1.0, np.where(S > K, 0.0, -1.0))
 
 def linear_scale(value, worst, best):
-    """Linearly scales a value from a 'worst' to 'best' range to a 0-5 score."""
-    if best < worst: # Lower is better
-        worst, best = best, worst
-        value = max(worst, min(best, value)) # Clamp
-        score = 5 * (best - value) / (best - worst)
-    else: # Higher is better
-        value = max(worst, min(best, value)) # Clamp
-        score = 5 * (value - worst) / (best - worst)
-    return score
+    """
+    Linearly scales a value (scalar or array) from a 'worst' to 'best' range to a 0-5 score.
+    The direction lives in the sign of (best - worst), so lower-is-better needs no branch.
+    """
+    value = np.clip(value, min(worst, best), max(worst, best)) # Clamp
+    return 5 * (value - worst) / (best - worst)
 
 # --- Scoring Logic ---
-def score_option(option, current_price, portfolio_value, sector, rsi, sma_50, sma_200, hv_low_1y, hv_high_1y):
-    """Scores a single put option using continuous linear functions and IV Rank."""
-    strike = option['strike']
-    premium = option['bid']
-    iv = option['impliedVolatility']
-    dte = (datetime.datetime.strptime(option['expirationDate'], '%Y-%m-%d') - datetime.datetime.now()).days
-    
-    if dte <= 0 or premium <= 0 or strike <= 0:
+def score_options_chain(puts, ticker, expiration, dte, current_price, portfolio_value, sector,
+                        rsi, sma_50, sma_200, hv_low_1y, hv_high_1y):
+    """
+    Scores every put of one expiration (`dte` days out) at once using continuous linear
+    functions and IV Rank. Returns a dict of equal-length column arrays with one entry
+    per put that passes the filters.
+    """
+    if dte <= 0:
         return None
 
+    strike = puts['strike'].to_numpy(dtype=float)
+    premium = puts['bid'].to_numpy(dtype=float)
+    iv = puts['impliedVolatility'].to_numpy(dtype=float)
+
     capital_at_risk_per_share = strike - premium
-    annualized_return = (premium / capital_at_risk_per_share) * (365 / dte) if capital_at_risk_per_share > 0 else 0
-    if annualized_return < 0.08:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annualized_return = np.where(capital_at_risk_per_share > 0,
+                                     (premium / capital_at_risk_per_share) * (365 / dte), 0.0)
+
+    # One mask drops ITM strikes and rows without a usable bid, strike or IV, or under
+    # 8% annualized, before any of the delta or scoring math runs
+    keep = ((strike < current_price) & (premium > 0) & (strike > 0) & np.isfinite(iv)
+            & (annualized_return >= 0.08))
+    if not keep.any():
         return None
+    strike, premium, iv = strike[keep], premium[keep], iv[keep]
+    annualized_return = annualized_return[keep]
 
     # Calculate IV Rank
     iv_range = hv_high_1y - hv_low_1y
     if iv_range > 0:
         iv_rank = (iv - hv_low_1y) / iv_range
     else:
-        iv_rank = 0.5 # Default to neutral if no range
-    iv_rank = max(0, min(1, iv_rank)) # Clamp between 0 and 1
+        iv_rank = np.full_like(iv, 0.5) # Default to neutral if no range
+    iv_rank = np.clip(iv_rank, 0, 1) # Clamp between 0 and 1
 
     # 1. Return on Capital (45% Weight)
     score_ar = linear_scale(annualized_return, worst=0.08, best=0.25)
@@ -248,21 +507,25 @@ def score_option(option, current_price, portfolio_value, sector, rsi, sma_50, sm
     T = dte / 365.0
     r = 0.04 
     delta = black_scholes_put_delta(current_price, strike, T, r, iv)
-    abs_delta = abs(delta)
+    abs_delta = np.abs(delta)
     score_delta = linear_scale(abs_delta, worst=0.35, best=0.10) # Lower is better
     margin_of_safety = (current_price - strike) / current_price
     score_mos = linear_scale(margin_of_safety, worst=0.05, best=0.20)
     score_prob_safety = (score_delta + score_mos) / 2
 
-    # 3. Basic Technical Indicators (15% Weight)
+    # 3. Basic Technical Indicators (15% Weight) - per ticker, so scalars
     score_rsi = linear_scale(rsi, worst=65, best=35) # Lower is better
     price_vs_sma_pct = (current_price - sma_200) / sma_200
-    score_sma = linear_scale(price_vs_sma_pct, worst=0.0, best=0.15)
+    # Neutral when there is not enough history for the 200-day SMA
+    score_sma = 2.5 if math.isnan(price_vs_sma_pct) else linear_scale(price_vs_sma_pct, worst=0.0, best=0.15)
     score_technicals = (score_rsi + score_sma) / 2
 
     # 4. Risk Management (5% Weight)
     capital_at_risk_total = (strike * 100) - (premium * 100)
-    risk_as_pct_portfolio = (capital_at_risk_total / portfolio_value) * 100 if portfolio_value > 0 else float('inf')
+    if portfolio_value > 0:
+        risk_as_pct_portfolio = (capital_at_risk_total / portfolio_value) * 100
+    else:
+        risk_as_pct_portfolio = np.full_like(capital_at_risk_total, np.inf)
     score_sizing = linear_scale(risk_as_pct_portfolio, worst=10.0, best=1.0) # Lower is better
 
     # Final Score Calculation
@@ -271,52 +534,128 @@ def score_option(option, current_price, portfolio_value, sector, rsi, sma_50, sm
                     (score_technicals * 0.15) + \
                     (score_sizing * 0.05)) / 5 * 100
     
+    n = len(strike)
     return {
-        'Expiration': option['expirationDate'], 'Strike': strike, 'Premium': premium,
-        'DTE': dte, 'IV Rank': iv_rank, 'Delta': delta, 'Ann. Return': annualized_return,
+        'Expiration': np.full(n, expiration, dtype=object), 'Strike': strike, 'Premium': premium,
+        'DTE': np.full(n, dte), 'IV Rank': iv_rank, 'Delta': delta, 'Ann. Return': annualized_return,
         'Margin of Safety': margin_of_safety, 'Score': final_score,
-        'Ticker': option['ticker'], 'Sector': sector
+        'Ticker': np.full(n, ticker, dtype=object), 'Sector': np.full(n, sector, dtype=object)
     }
 
 # --- Main Processing Function ---
-def process_tickers(tickers, min_dte, max_dte, portfolio_value, status_callback=None):
-    all_options = []
-    for i, ticker in enumerate(tickers):
-        if status_callback:
-            status_callback(f"Fetching data for {ticker}...", (i + 1) / len(tickers))
-
-        (current_price, sector, expirations, rsi, sma_50, sma_200, 
-         hv_low_1y, hv_high_1y) = get_stock_data_and_technicals(ticker)
-
-        if current_price is None or not expirations:
-            print(f"Skipping {ticker} due to missing data.")
-            continue
-
-        valid_expirations = [exp for exp in expirations if min_dte <= (datetime.datetime.strptime(exp, '%Y-%m-%d') - datetime.datetime.now()).days <= max_dte]
-
-        for exp in valid_expirations:
-            puts = get_options_chain_puts(ticker, exp)
-            if puts is None or puts.empty: continue
-            puts['ticker'] = ticker
-            puts['expirationDate'] = exp
-            otm_puts = puts[puts['strike'] < current_price]
-
-            for _, row in otm_puts.iterrows():
-                score_data = score_option(row, current_price, portfolio_value, sector, 
-                                          rsi, sma_50, sma_200, hv_low_1y, hv_high_1y)
-                if score_data:
-                    all_options.append(score_data)
+# Fetches are network-bound, so threads overlap the HTTPS waits on Yahoo
+MAX_FETCH_WORKERS = 8
+
+def _ticker_context(ticker, close, min_dte, max_dte, now):
+    """
+    Fetches price and technicals for one ticker plus its (expiration, DTE) pairs
+    inside the DTE window. Runs on a worker thread; returns None if the ticker has no data.
+    """
+    technicals = get_stock_data_and_technicals(ticker, close)
+
+    expirations = technicals[2] if technicals is not None else None
+    if expirations:
+        # Load the shared Ticker's expiration list here, on this ticker's only thread.
+        # After a technicals cache hit it is still cold, and every concurrent
+        # option_chain() call in phase 2 would otherwise download it again.
+        _ticker(ticker).options
+
+    if not expirations: # No price data or no listed expirations
+        print(f"Skipping {ticker} due to missing data.")
+        return None
+
+    # Days to expiration for the whole list in one vectorized pass
+    dtes = (pd.to_datetime(expirations, format='%Y-%m-%d') - now).days
+    valid_expirations = [(exp, int(dte)) for exp, dte in zip(expirations, dtes) if min_dte <= dte <= max_dte]
+    return technicals, valid_expirations
+
+def _score_chain(puts, ticker, exp, dte, technicals, portfolio_value):
+    """Scores the OTM puts of one fetched chain; returns None if nothing passes."""
+    if puts is None or puts.empty:
+        return None
+    (current_price, sector, _, rsi, sma_50, sma_200,
+     hv_low_1y, hv_high_1y) = technicals
+    return score_options_chain(puts, ticker, exp, dte, current_price, portfolio_value,
+                               sector, rsi, sma_50, sma_200, hv_low_1y, hv_high_1y)
+
+def process_tickers(tickers, min_dte, max_dte, portfolio_value, status_callback=None, top_per_ticker=5,
+                    max_workers=MAX_FETCH_WORKERS):
+    """
+    Scores OTM puts for every ticker and returns the best `top_per_ticker` rows
+    per ticker (all rows if None), sorted by Score. The number of rows scored
+    before that cut is kept in df.attrs['total_found']. `max_workers` caps the
+    number of concurrent Yahoo requests; lower it if Yahoo starts throttling.
+    """
+    all_chains = []
+    if not tickers:
+        return pd.DataFrame()
+    if status_callback:
+        status_callback("Downloading price history...", 0.0)
+    histories = get_price_histories(tuple(tickers))
+    # One reference time for the whole scan, so every DTE is measured from the same instant
+    now = pd.Timestamp(datetime.datetime.now())
+
+    contexts = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Phase 1: price, technicals and expiration list for every ticker.
+        # Progress is reported from this (the Streamlit script) thread as each fetch finishes.
+        futures = {
+            executor.submit(_ticker_context, ticker, histories.get(ticker), min_dte, max_dte, now): ticker
+            for ticker in tickers
+        }
+        for i, future in enumerate(as_completed(futures)):
+            ticker = futures[future]
+            if status_callback:
+                status_callback(f"Fetched data for {ticker}...", 0.5 * (i + 1) / len(futures))
+            try:
+                context = future.result()
+            except Exception as e:
+                print(f"Error processing {ticker}: {e}")
+                continue
+            if context is not None:
+                contexts[ticker] = context
+
+        # Phase 2: every (ticker, expiration) chain is fetched concurrently rather
+        # than one expiration after another inside each ticker's task
+        futures = {
+            executor.submit(get_options_chain_puts, ticker, exp): (ticker, exp, dte)
+            for ticker, (_, valid_expirations) in contexts.items()
+            for exp, dte in valid_expirations
+        }
+        for i, future in enumerate(as_completed(futures)):
+            ticker, exp, dte = futures[future]
+            if status_callback:
+                status_callback(f"Fetched {ticker} {exp} options...", 0.5 + 0.5 * (i + 1) / len(futures))
+            try:
+                scored_chain = _score_chain(future.result(), ticker, exp, dte,
+                                            contexts[ticker][0], portfolio_value)
+            except Exception as e:
+                print(f"Error processing {ticker} {exp}: {e}")
+                continue
+            if scored_chain is not None:
+                all_chains.append(scored_chain)
         
-    if not all_options:
+    if not all_chains:
         return pd.DataFrame()
 
-    df = pd.DataFrame(all_options)
-    
     # Define the desired column order with Ticker first and IV Rank instead of IV
     column_order = [
         'Ticker', 'Expiration', 'Strike', 'Premium', 'Score', 'Ann. Return', 
         'Margin of Safety', 'DTE', 'IV Rank', 'Delta', 'Sector'
     ]
-    df = df.reindex(columns=column_order)
-
-    return df.sort_values(by='Score', ascending=False).reset_index(drop=True)
+    # One array concatenation per column, then a single DataFrame construction
+    df = pd.DataFrame({col: np.concatenate([chain[col] for chain in all_chains]) for col in column_order})
+
+    # Categorical tickers group on small integer codes instead of hashing strings
+    df['Ticker'] = pd.Categorical(df['Ticker'], categories=list(dict.fromkeys(tickers)))
+    total_found = len(df)
+
+    if top_per_ticker is not None:
+        # Partial selection per ticker instead of a global sort followed by head()
+        top_index = (df.groupby('Ticker', observed=True, sort=False)['Score']
+                     .nlargest(top_per_ticker).index.get_level_values(-1))
+        df = df.loc[top_index]
+
+    df = df.sort_values(by='Score', ascending=False).reset_index(drop=True)
+    df.attrs['total_found'] = total_found
+    return df